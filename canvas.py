@@ -1,29 +1,138 @@
+from collections import deque
+
 import cv2
 import numpy as np
+from numba import njit, prange
+
+
+# BGR values for set_color_by_name
+_COLOR_NAMES = {
+    "BLUE": (255, 0, 0),
+    "GREEN": (0, 255, 0),
+    "RED": (0, 0, 255),
+    "YELLOW": (0, 255, 255),
+    "PURPLE": (255, 0, 255),
+    "ORANGE": (0, 165, 255),
+    "WHITE": (255, 255, 255),
+    "CYAN": (255, 255, 0),
+    "MAGENTA": (255, 0, 255)
+}
+
+
+@njit(cache=True)
+def _advance_stroke(points, head, count, x, y, width, height,
+                    prev_x, prev_y, thickness):
+    """
+    Per-frame stroke math in one compiled pass: clamp (x, y) to the canvas,
+    push it into the smoothing ring buffer, take the weighted average and
+    compute the bbox of the segment from the previous point (prev_x < 0
+    means the stroke is just starting).
+
+    Returns (sx, sy, x1, y1, x2, y2, head, count)
+    """
+    # Bounds checking
+    x = max(0, min(width - 1, x))
+    y = max(0, min(height - 1, y))
+
+    # Add to smoothing ring buffer
+    window = points.shape[0]
+    points[head, 0] = x
+    points[head, 1] = y
+    head = (head + 1) % window
+    count = min(count + 1, window)
+
+    # Weighted smoothing (linear 0.5..1.0, more weight to recent points);
+    # slot `head` holds the oldest point once the buffer has wrapped
+    if count >= 2:
+        total = 0.0
+        sum_x = 0.0
+        sum_y = 0.0
+        for age in range(count):
+            weight = 0.5 + 0.5 * age / (count - 1)
+            slot = (head + age) % count
+            sum_x += weight * points[slot, 0]
+            sum_y += weight * points[slot, 1]
+            total += weight
+        sx = int(sum_x / total)
+        sy = int(sum_y / total)
+    else:
+        sx = x
+        sy = y
+
+    if prev_x < 0:
+        prev_x = sx
+        prev_y = sy
+
+    x1 = max(0, min(prev_x, sx) - thickness)
+    x2 = min(width, max(prev_x, sx) + thickness)
+    y1 = max(0, min(prev_y, sy) - thickness)
+    y2 = min(height, max(prev_y, sy) + thickness)
+
+    return sx, sy, x1, y1, x2, y2, head, count
+
+
+@njit(cache=True, parallel=True)
+def _composite(img, ids, palette, x1, y1, x2, y2):
+    """
+    Write palette[id] into img wherever id != 0 inside (x1, y1, x2, y2),
+    in one pass over the rows
+    """
+    for y in prange(y1, y2):
+        for x in range(x1, x2):
+            idx = ids[y, x]
+            if idx != 0:
+                img[y, x, 0] = palette[idx, 0]
+                img[y, x, 1] = palette[idx, 1]
+                img[y, x, 2] = palette[idx, 2]
+
+
+def _warm_up():
+    """Compile _advance_stroke and _composite on dummy inputs before the first stroke"""
+    _advance_stroke(np.zeros((2, 2), dtype=np.int32), 0, 0, 0, 0, 1, 1, -1, -1, 1)
+    _composite(np.zeros((1, 1, 3), dtype=np.uint8), np.zeros((1, 1), dtype=np.uint8),
+               np.zeros((256, 3), dtype=np.uint8), 0, 0, 1, 1)
+
+
+_warm_up()
 
 
 class Canvas:
     def __init__(self, width, height):
         self.width = width
         self.height = height
-        self.canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        # Kept as a host ndarray rather than a cv2.UMat: each frame draws one
+        # small segment (microseconds on the CPU) but the whole canvas is read
+        # back for compositing, slicing and undo patches, so an OpenCL-backed
+        # buffer would add a full-frame device download per frame.
+        # Pixels hold palette ids (0 = empty/erased) rather than BGR, a third
+        # of the memory traffic; colors are resolved only when compositing
+        self.canvas = np.zeros((height, width), dtype=np.uint8)
+        self.palette = np.zeros((256, 3), dtype=np.uint8)  # id -> BGR
+        self._palette_ids = {}  # BGR tuple -> id, filled on first use
+        self._free_ids = list(range(len(self.palette) - 1, 0, -1))  # pop() -> 1 first
 
         # Stroke state
         self.prev_point = None
+        # Points not yet rasterized, drawn as one polyline on flush
+        self._pending = []
+        self._pending_style = None  # (palette id, thickness)
 
         # Brush config
         self.current_color = (255, 0, 0)
         self.brush_thickness = 8
         self.eraser_thickness = 50
 
-        # Smoothing with adaptive window
-        self.smooth_points = []
+        # Smoothing with adaptive window (fixed ring buffer, oldest overwritten)
         self.smooth_window = 5  # Increased for smoother lines
+        self.smooth_points = np.empty((self.smooth_window, 2), dtype=np.int32)
+        self._smooth_count = 0
+        self._smooth_head = 0  # Next slot to write
 
-        # Enhanced undo history
-        self.history = []
+        # Enhanced undo history: [region, patch, content_bbox] deltas
         self.max_history = 20  # More undo steps
+        self.history = deque(maxlen=self.max_history)  # Drops oldest itself
         self.stroke_active = False
+        self._stroke_entry = None  # History entry grown by the active stroke
 
         # Frame-loss handling with adaptive threshold
         self.missing_frames = 0
@@ -31,6 +140,8 @@ class Canvas:
 
         # Performance optimization
         self.dirty_region = None  # Track changed areas
+        self._has_content = False  # Set on first brush mark, avoids full-canvas scans
+        self._content_bbox = None  # Running (x1, y1, x2, y2) of all brush marks
 
     # ---------------- COLOR ----------------
     def set_color(self, color_tuple):
@@ -40,134 +151,204 @@ class Canvas:
 
     def set_color_by_name(self, name):
         """Legacy method for color name support"""
-        colors = {
-            "BLUE": (255, 0, 0),
-            "GREEN": (0, 255, 0),
-            "RED": (0, 0, 255),
-            "YELLOW": (0, 255, 255),
-            "PURPLE": (255, 0, 255),
-            "ORANGE": (0, 165, 255),
-            "WHITE": (255, 255, 255),
-            "CYAN": (255, 255, 0),
-            "MAGENTA": (255, 0, 255)
-        }
-        self.current_color = colors.get(name, self.current_color)
+        self.current_color = _COLOR_NAMES.get(name, self.current_color)
+
+    def _palette_id(self, color):
+        """
+        Palette id of a BGR color, registering it on first use. If every id
+        is still on the canvas or in the undo history, the closest
+        registered color is used instead
+        """
+        color = tuple(int(c) for c in color)
+        idx = self._palette_ids.get(color)
+        if idx is None:
+            if not self._free_ids:
+                self._reclaim_palette_ids()
+            if not self._free_ids:
+                return self._nearest_palette_id(color)
+            idx = self._free_ids.pop()
+            self.palette[idx] = color
+            self._palette_ids[color] = idx
+        return idx
+
+    def _reclaim_palette_ids(self):
+        """Free the ids no longer referenced by the canvas, history or pending stroke"""
+        used = np.bincount(self.canvas.ravel(), minlength=len(self.palette)) > 0
+        for _, patch, _ in self.history:
+            if patch is not None:
+                used |= np.bincount(patch.ravel(), minlength=len(self.palette)) > 0
+        if self._pending_style is not None:
+            used[self._pending_style[0]] = True
+        for color, idx in list(self._palette_ids.items()):
+            if not used[idx]:
+                del self._palette_ids[color]
+                self._free_ids.append(idx)
+
+    def _nearest_palette_id(self, color):
+        """Registered palette id whose color is closest to a BGR color"""
+        ids = np.fromiter(self._palette_ids.values(), dtype=np.intp)
+        diff = self.palette[ids].astype(np.int32) - color
+        return int(ids[np.argmin((diff * diff).sum(axis=1))])
 
     # ---------------- DRAW ----------------
     def draw(self, x, y, eraser=False):
         """Enhanced drawing with better smoothing and bounds checking"""
         self.missing_frames = 0
 
-        # Bounds checking
-        x = max(0, min(self.width - 1, x))
-        y = max(0, min(self.height - 1, y))
-
-        # Save canvas once per stroke (for undo)
+        # Open one undo entry per stroke, filled lazily as the stroke grows
         if not self.stroke_active:
-            self.save_state()
+            self._begin_stroke()
             self.stroke_active = True
 
-        # Add to smoothing buffer
-        self.smooth_points.append((x, y))
-        if len(self.smooth_points) > self.smooth_window:
-            self.smooth_points.pop(0)
-
-        # Weighted smoothing (more weight to recent points)
-        if len(self.smooth_points) >= 2:
-            weights = np.linspace(0.5, 1.0, len(self.smooth_points))
-            weights = weights / weights.sum()
-            
-            avg_x = int(sum(p[0] * w for p, w in zip(self.smooth_points, weights)))
-            avg_y = int(sum(p[1] * w for p, w in zip(self.smooth_points, weights)))
-            current_point = (avg_x, avg_y)
-        else:
-            current_point = (x, y)
-
-        # First point initialization
-        if self.prev_point is None:
-            self.prev_point = current_point
-            # Draw a dot for single clicks
-            color = (0, 0, 0) if eraser else self.current_color
-            thickness = self.eraser_thickness if eraser else self.brush_thickness
-            cv2.circle(self.canvas, current_point, thickness // 2, color, -1)
-            return
-
-        # Draw line between points
-        color = (0, 0, 0) if eraser else self.current_color
+        color = 0 if eraser else self._palette_id(self.current_color)
         thickness = self.eraser_thickness if eraser else self.brush_thickness
 
-        # Use LINE_AA for anti-aliased lines (smoother)
-        cv2.line(
-            self.canvas,
-            self.prev_point,
-            current_point,
-            color,
-            thickness,
-            cv2.LINE_AA
+        # Clamp, smooth and bound the new segment in one compiled call
+        prev_x, prev_y = self.prev_point if self.prev_point is not None else (-1, -1)
+        (sx, sy, x1, y1, x2, y2,
+         self._smooth_head, self._smooth_count) = _advance_stroke(
+            self.smooth_points, self._smooth_head, self._smooth_count,
+            x, y, self.width, self.height, prev_x, prev_y, thickness
         )
+        current_point = (sx, sy)
 
-        # Update dirty region for potential optimization
-        self._update_dirty_region(self.prev_point, current_point, thickness)
+        # Update dirty region (and undo patch) before touching the pixels
+        self._update_dirty_region((x1, y1, x2, y2), eraser)
+
+        style = (color, thickness)
+
+        # Queue the segment; it is rasterized on the next flush. A new stroke
+        # or style starts a new polyline, and a zero-length first segment
+        # paints the dot for single clicks with the same round cap.
+        if self.prev_point is None or style != self._pending_style:
+            self._flush_pending()
+            self._pending_style = style
+        if not self._pending:
+            self._pending.append(self.prev_point or current_point)
+        self._pending.append(current_point)
+        if not eraser:
+            self._has_content = True
 
         self.prev_point = current_point
 
-    def _update_dirty_region(self, p1, p2, thickness):
-        """Track which regions of canvas have changed"""
-        x1, y1 = p1
-        x2, y2 = p2
-        
-        min_x = max(0, min(x1, x2) - thickness)
-        max_x = min(self.width, max(x1, x2) + thickness)
-        min_y = max(0, min(y1, y2) - thickness)
-        max_y = min(self.height, max(y1, y2) + thickness)
-        
-        if self.dirty_region is None:
-            self.dirty_region = (min_x, min_y, max_x, max_y)
-        else:
-            old_x1, old_y1, old_x2, old_y2 = self.dirty_region
-            self.dirty_region = (
-                min(min_x, old_x1),
-                min(min_y, old_y1),
-                max(max_x, old_x2),
-                max(max_y, old_y2)
-            )
+    def _flush_pending(self):
+        """Rasterize queued stroke points with a single cv2.polylines call"""
+        if self._pending:
+            # Palette ids cannot be blended, so no anti-aliasing (LINE_8)
+            color, thickness = self._pending_style
+            cv2.polylines(self.canvas, [np.array(self._pending, dtype=np.int32)],
+                          False, color, thickness, cv2.LINE_8)
+            self._pending = []
+
+    def _reset_smoothing(self):
+        """Drop buffered points so the next stroke starts unsmoothed"""
+        self._smooth_count = 0
+        self._smooth_head = 0
+
+    def _update_dirty_region(self, region, eraser=False):
+        """Track which regions of canvas are about to change"""
+        self._snapshot_region(*region)
+
+        self.dirty_region = self._union_bbox(self.dirty_region, region)
+        # Erasing never grows the content area
+        if not eraser:
+            self._content_bbox = self._union_bbox(self._content_bbox, region)
+
+    @staticmethod
+    def _union_bbox(a, b):
+        """Union of two (x1, y1, x2, y2) boxes, either of which may be None"""
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+    def _begin_stroke(self):
+        """Push an empty undo entry for the stroke that is starting"""
+        # Recorded even on a blank canvas: region-limited entries only
+        # restore correctly if every change since them is in the history
+        self._stroke_entry = [None, None, self._content_bbox]
+        self.history.append(self._stroke_entry)
+
+    def _snapshot_region(self, x1, y1, x2, y2):
+        """Grow the active stroke's undo patch to cover a region before drawing"""
+        entry = self._stroke_entry
+        if entry is None:
+            return
 
+        region, patch = entry[0], entry[1]
+        if region is None:
+            entry[0] = (x1, y1, x2, y2)
+            entry[1] = self.canvas[y1:y2, x1:x2].copy()
+            return
+
+        old_x1, old_y1, old_x2, old_y2 = region
+        if x1 >= old_x1 and y1 >= old_y1 and x2 <= old_x2 and y2 <= old_y2:
+            return
+
+        # Pixels outside the old region are untouched by this stroke, so the
+        # live canvas still holds their pre-stroke values
+        new_x1, new_y1 = min(x1, old_x1), min(y1, old_y1)
+        new_x2, new_y2 = max(x2, old_x2), max(y2, old_y2)
+        merged = self.canvas[new_y1:new_y2, new_x1:new_x2].copy()
+        merged[old_y1 - new_y1:old_y2 - new_y1,
+               old_x1 - new_x1:old_x2 - new_x1] = patch
+        entry[0] = (new_x1, new_y1, new_x2, new_y2)
+        entry[1] = merged
 
     def reset(self):
         """Reset stroke state when hand is not detected"""
         self.missing_frames += 1
         if self.missing_frames >= self.max_missing:
+            self._flush_pending()
             self.prev_point = None
-            self.smooth_points.clear()
+            self._reset_smoothing()
             self.stroke_active = False
+            self._stroke_entry = None
             self.missing_frames = 0
             self.dirty_region = None
 
     def clear(self):
         """Clear entire canvas"""
-        self.save_state()
+        # Only save if canvas has content; everything outside the
+        # content box is already blank
+        self._flush_pending()
+        if self._has_content:
+            self.save_state(self._content_bbox)
         self.canvas[:] = 0
+        self._has_content = False
+        self._content_bbox = None
         self.prev_point = None
-        self.smooth_points.clear()
+        self._reset_smoothing()
         self.stroke_active = False
+        self._stroke_entry = None
         self.dirty_region = None
 
  
-    def save_state(self):
-        """Save current canvas state to history"""
-        # Only save if canvas has content (optimization)
-        if np.any(self.canvas):
-            self.history.append(self.canvas.copy())
-            if len(self.history) > self.max_history:
-                self.history.pop(0)
+    def save_state(self, region=None):
+        """Save canvas state to history (region defaults to the full canvas)"""
+        self._flush_pending()
+        if region is None:
+            region = (0, 0, self.width, self.height)
+        x1, y1, x2, y2 = region
+        patch = self.canvas[y1:y2, x1:x2].copy()
+        self.history.append([region, patch, self._content_bbox])
 
     def undo(self):
         """Undo last action"""
+        self._flush_pending()
         if self.history:
-            self.canvas = self.history.pop()
+            region, patch, content_bbox = self.history.pop()
+            if region is not None:
+                x1, y1, x2, y2 = region
+                self.canvas[y1:y2, x1:x2] = patch
+            self._content_bbox = content_bbox
+            self._has_content = content_bbox is not None
             self.prev_point = None
-            self.smooth_points.clear()
+            self._reset_smoothing()
             self.stroke_active = False
+            self._stroke_entry = None
             self.dirty_region = None
             return True
         return False
@@ -176,7 +357,7 @@ class Canvas:
     def save_to_file(self, filename="canvas_drawing.png"):
         """Save canvas to image file"""
         try:
-            cv2.imwrite(filename, self.canvas)
+            cv2.imwrite(filename, self.to_bgr())
             return True
         except Exception as e:
             print(f"Error saving canvas: {e}")
@@ -187,21 +368,76 @@ class Canvas:
         try:
             loaded = cv2.imread(filename)
             if loaded is not None and loaded.shape[:2] == (self.height, self.width):
+                ids = self._quantize(loaded)
                 self.save_state()  # Save current state before loading
-                self.canvas = loaded
+                self.canvas = ids
+                self._has_content = bool(np.any(ids))
+                self._content_bbox = (
+                    (0, 0, self.width, self.height) if self._has_content else None
+                )
                 return True
         except Exception as e:
             print(f"Error loading canvas: {e}")
         return False
 
+    def _quantize(self, bgr):
+        """
+        Map a BGR image onto palette ids, registering its colors
+        Near-black pixels (gray <= 10, never shown by the old composite)
+        become empty. The most common colors are registered first; once the
+        palette is full the rest (e.g. anti-aliased edge shades) take the
+        closest registered color
+        """
+        # Unique over packed 24-bit keys, much faster than unique(axis=0)
+        pixels = bgr.reshape(-1, 3).astype(np.uint32)
+        keys, inverse, counts = np.unique(
+            pixels[:, 0] | pixels[:, 1] << 8 | pixels[:, 2] << 16,
+            return_inverse=True, return_counts=True)
+        colors = np.stack([keys & 0xFF, keys >> 8 & 0xFF, keys >> 16], axis=1)
+        visible = np.flatnonzero(colors @ np.array([0.114, 0.587, 0.299]) > 10)
+        visible = visible[np.argsort(-counts[visible], kind="stable")]
+        new_colors = sum(1 for c in colors[visible].tolist()
+                         if tuple(c) not in self._palette_ids)
+        if new_colors > len(self._free_ids):
+            self._reclaim_palette_ids()
+
+        ids = np.zeros(len(colors), dtype=np.uint8)
+        for i in visible:
+            color = tuple(colors[i].tolist())
+            if color in self._palette_ids or self._free_ids:
+                ids[i] = self._palette_id(color)
+            else:
+                ids[i] = self._nearest_palette_id(color)
+        return ids[inverse.reshape(-1)].reshape(self.height, self.width)
+
     # ---------------- ACCESS ----------------
+    def to_bgr(self):
+        """Render the canvas to a new BGR image"""
+        self._flush_pending()
+        return self.palette[self.canvas]
+
     def get_canvas(self):
-        """Return copy of canvas"""
-        return self.canvas.copy()
+        """Return a new BGR rendering of canvas (same as clone())"""
+        return self.to_bgr()
+
+    def clone(self):
+        """Return writable BGR copy of canvas"""
+        return self.to_bgr()
+
+    def composite(self, img):
+        """Draw the canvas onto a BGR frame of the same size, in place"""
+        self._flush_pending()
+        # Ink only exists inside the running content box, so the rest of
+        # the frame is never visited (and a blank canvas costs nothing)
+        if self._content_bbox is not None:
+            _composite(img, self.canvas, self.palette, *self._content_bbox)
 
     def get_canvas_view(self):
-        """Return view of canvas (no copy, for performance)"""
-        return self.canvas
+        """Return read-only view of the palette-id canvas (no copy)"""
+        self._flush_pending()
+        view = self.canvas.view()
+        view.flags.writeable = False
+        return view
 
     def set_brush_size(self, size):
         """Set brush thickness with bounds"""
@@ -213,22 +449,21 @@ class Canvas:
 
     # ---------------- UTILITY ----------------
     def is_empty(self):
-        """Check if canvas is empty"""
-        return not np.any(self.canvas)
+        """Check if canvas is empty (erasing strokes does not reset this)"""
+        return not self._has_content
 
     def get_bounding_box(self):
-        """Get bounding box of all drawn content"""
-        gray = cv2.cvtColor(self.canvas, cv2.COLOR_BGR2GRAY)
-        coords = cv2.findNonZero(gray)
-        if coords is not None:
-            x, y, w, h = cv2.boundingRect(coords)
-            return (x, y, w, h)
-        return None
+        """Get bounding box of all drawn content (conservative, includes brush margin)"""
+        if self._content_bbox is None:
+            return None
+        x1, y1, x2, y2 = self._content_bbox
+        return (x1, y1, x2 - x1, y2 - y1)
 
     def crop_to_content(self):
-        """Crop canvas to actual content"""
+        """Crop canvas to actual content (BGR)"""
+        self._flush_pending()
         bbox = self.get_bounding_box()
         if bbox:
             x, y, w, h = bbox
-            return self.canvas[y:y+h, x:x+w]
-        return self.canvas
\ No newline at end of file
+            return self.palette[self.canvas[y:y+h, x:x+w]]
+        return self.to_bgr()
\ No newline at end of file
@@ -1,52 +1,210 @@
 import math
 
+import numpy as np
+from numba import njit
 
-def fingers_up(lm):
-    """
-    Detect which fingers are extended
-    Returns: [thumb, index, middle, ring, pinky]
-    """
-    if not lm or len(lm) < 21:
-        return [False] * 5
 
-    fingers = []
+# Thumb, Index, Middle, Ring, Pinky: tip and reference joint ids, the axis
+# each finger extends along and the signed margin it must clear. The thumb
+# is tested horizontally (tip right of IP joint, for a right hand; a left
+# hand would need the opposite sign), the others vertically (tip at least
+# 10px above the PIP joint, the margin avoiding jitter)
+FINGER_TIPS = np.array([4, 8, 12, 16, 20])
+FINGER_PIPS = np.array([3, 6, 10, 14, 18])
+FINGER_AXES = np.array([0, 1, 1, 1, 1])
+FINGER_SIGNS = np.array([1, -1, -1, -1, -1])
+FINGER_MARGINS = np.array([0, 10, 10, 10, 10])
 
-    # Thumb detection (horizontal check for better accuracy)
-    # Check if thumb tip is to the right/left of thumb IP joint
-    thumb_is_up = lm[4][1] > lm[3][1]  # For right hand
-    # For left hand detection, you might need: thumb_is_up = lm[4][1] < lm[3][1]
-    fingers.append(thumb_is_up)
 
-    # Index, Middle, Ring, Pinky (vertical check)
-    # Finger is up if tip is higher (lower y-value) than PIP joint
-    tips = [8, 12, 16, 20]
-    pips = [6, 10, 14, 18]
-    
-    for tip, pip in zip(tips, pips):
-        # Add some threshold to avoid jitter
-        is_up = lm[tip][2] < lm[pip][2] - 10
-        fingers.append(is_up)
+def _as_landmarks(lm, min_count=21):
+    """
+    Return landmarks as a contiguous int32 array of (x, y, z) rows
+    Accepts plain lists of (x, y) or (x, y, z) tuples; returns None if too
+    few landmarks
+    """
+    if lm is None or len(lm) < min_count:
+        return None
+    if isinstance(lm, np.ndarray) and lm.dtype == np.int32 and lm.flags.c_contiguous:
+        return lm
+    return np.ascontiguousarray(lm, dtype=np.int32)
 
-    return fingers
 
+# ---------------- JIT KERNELS ----------------
+# Compiled at import (or loaded from the on-disk cache, see the warm-up at
+# the end of the module); they expect an int32 (N, 2) or (N, 3) array and
+# only read the x and y columns
 
+@njit(cache=True, fastmath=True)
 def distance(p1, p2):
     """Calculate Euclidean distance between two points"""
     return math.hypot(p2[0] - p1[0], p2[1] - p1[1])
 
 
+@njit(cache=True, fastmath=True)
+def distance_sq(p1, p2):
+    """Squared Euclidean distance; compare against threshold**2, no sqrt"""
+    dx = p2[0] - p1[0]
+    dy = p2[1] - p1[1]
+    return dx * dx + dy * dy
+
+
+@njit(cache=True, fastmath=True)
+def _fingers_up(lm):
+    # All five fingers in one 5-wide compare: gather each finger's tip and
+    # joint coordinate along its own axis from the flattened rows
+    flat = lm.ravel()
+    cols = lm.shape[1]
+    tips = flat[FINGER_TIPS * cols + FINGER_AXES]
+    pips = flat[FINGER_PIPS * cols + FINGER_AXES]
+    return FINGER_SIGNS * (tips - pips) > FINGER_MARGINS
+
+
+@njit(cache=True, fastmath=True)
+def _finger_distance_sq(lm, finger1_idx, finger2_idx):
+    # Row views are free inside compiled code; threshold tests skip the sqrt
+    return distance_sq(lm[finger1_idx], lm[finger2_idx])
+
+
+@njit(cache=True, fastmath=True)
+def _finger_distance(lm, finger1_idx, finger2_idx):
+    return math.sqrt(_finger_distance_sq(lm, finger1_idx, finger2_idx))
+
+
+@njit(cache=True, fastmath=True)
+def _peace_from(fingers):
+    return fingers[1] and fingers[2] and not fingers[3] and not fingers[4]
+
+
+@njit(cache=True, fastmath=True)
+def _pointing_from(fingers):
+    return fingers[1] and not (fingers[0] or fingers[2] or fingers[3] or fingers[4])
+
+
+@njit(cache=True, fastmath=True)
+def _thumbs_up_from(lm, fingers):
+    # Thumb up, all others down
+    # Also check thumb is above wrist
+    thumb_above_wrist = lm[4, 1] < lm[0, 1]
+
+    return fingers[0] and not fingers[1:].any() and thumb_above_wrist
+
+
+@njit(cache=True, fastmath=True)
+def _is_fist(lm):
+    return not _fingers_up(lm).any()
+
+
+@njit(cache=True, fastmath=True)
+def _is_peace_sign(lm):
+    return _peace_from(_fingers_up(lm))
+
+
+@njit(cache=True, fastmath=True)
+def _is_pointing(lm):
+    return _pointing_from(_fingers_up(lm))
+
+
+@njit(cache=True, fastmath=True)
+def _palm_center(lm):
+    # Average of key palm points (base of each finger)
+    sum_x = lm[0, 0] + lm[5, 0] + lm[9, 0] + lm[13, 0] + lm[17, 0]
+    sum_y = lm[0, 1] + lm[5, 1] + lm[9, 1] + lm[13, 1] + lm[17, 1]
+    return int(sum_x / 5), int(sum_y / 5)
+
+
+@njit(cache=True, fastmath=True)
+def _hand_rotation(lm):
+    # Use wrist and middle finger base
+    dx = lm[9, 0] - lm[0, 0]
+    dy = lm[9, 1] - lm[0, 1]
+    return math.degrees(math.atan2(dy, dx))
+
+
+@njit(cache=True, fastmath=True)
+def _is_thumbs_up(lm):
+    return _thumbs_up_from(lm, _fingers_up(lm))
+
+
+@njit(cache=True, fastmath=True)
+def _evaluate_gestures(lm):
+    # Finger states are computed once and shared by every gesture test
+    fingers = _fingers_up(lm)
+    pinch_distance_sq = _finger_distance_sq(lm, 4, 8)
+    palm_x, palm_y = _palm_center(lm)
+    return (fingers, pinch_distance_sq, _hand_rotation(lm), palm_x, palm_y,
+            _pointing_from(fingers), _peace_from(fingers),
+            not fingers.any(), _thumbs_up_from(lm, fingers))
+
+
+@njit(cache=True, fastmath=True)
+def _point_confidence(lm):
+    fingers = _fingers_up(lm)
+    # Only index should be up
+    if fingers[1] and not (fingers[0] or fingers[2] or fingers[3] or fingers[4]):
+        # Check if index is really extended
+        extension = abs(lm[5, 1] - lm[8, 1])
+        return min(1.0, extension / 100)
+    return 0.0
+
+
+@njit(cache=True, fastmath=True)
+def _palm_confidence(lm):
+    fingers = _fingers_up(lm)
+    # All fingers should be up
+    if fingers.all():
+        return 1.0
+    elif fingers.sum() >= 4:
+        return 0.7
+    return 0.0
+
+
+# ---------------- PUBLIC API ----------------
+def fingers_up(lm):
+    """
+    Detect which fingers are extended
+    Returns: bool array [thumb, index, middle, ring, pinky]
+    """
+    lm = _as_landmarks(lm)
+    if lm is None:
+        return np.zeros(5, dtype=np.bool_)
+    return _fingers_up(lm)
+
+
+def evaluate_gestures(lm, pinch_threshold=40):
+    """
+    Compute all per-frame gesture features in one pass
+    Returns dict with fingers, pinch_distance, is_pinch, rotation,
+    palm_center, is_pointing, is_peace_sign, is_fist and is_thumbs_up,
+    or None if too few landmarks
+    """
+    lm = _as_landmarks(lm)
+    if lm is None:
+        return None
+
+    (fingers, pinch_distance_sq, rotation, palm_x, palm_y,
+     pointing, peace, fist, thumbs_up) = _evaluate_gestures(lm)
+
+    return {
+        'fingers': fingers,
+        'pinch_distance': math.sqrt(pinch_distance_sq),
+        'is_pinch': pinch_distance_sq < pinch_threshold * pinch_threshold,
+        'rotation': rotation,
+        'palm_center': (palm_x, palm_y),
+        'is_pointing': pointing,
+        'is_peace_sign': peace,
+        'is_fist': fist,
+        'is_thumbs_up': thumbs_up
+    }
+
+
 def is_pinch(lm, threshold=40):
     """
     Detect pinch gesture (thumb and index finger close together)
     """
-    if not lm or len(lm) < 9:
+    lm = _as_landmarks(lm, 9)
+    if lm is None:
         return False
-
-    thumb_tip = lm[4][1:]  # (x, y)
-    index_tip = lm[8][1:]  # (x, y)
-    
-    dist = distance(thumb_tip, index_tip)
-    return dist < threshold
+    return _finger_distance_sq(lm, 4, 8) < threshold * threshold
 
 
 def get_finger_distance(lm, finger1_idx=4, finger2_idx=8):
@@ -54,52 +212,42 @@ def get_finger_distance(lm, finger1_idx=4, finger2_idx=8):
     Get distance between any two finger landmarks
     Useful for dynamic brush sizing
     """
-    if not lm or len(lm) <= max(finger1_idx, finger2_idx):
+    lm = _as_landmarks(lm, max(finger1_idx, finger2_idx) + 1)
+    if lm is None:
         return 0
-    
-    p1 = lm[finger1_idx][1:]
-    p2 = lm[finger2_idx][1:]
-    return distance(p1, p2)
+    return _finger_distance(lm, finger1_idx, finger2_idx)
 
 
 def is_fist(lm):
     """Detect closed fist (all fingers down)"""
-    if not lm or len(lm) < 21:
+    lm = _as_landmarks(lm)
+    if lm is None:
         return False
-    
-    fingers = fingers_up(lm)
-    return not any(fingers)
+    return _is_fist(lm)
 
 
 def is_peace_sign(lm):
     """Detect peace sign (index and middle fingers up, others down)"""
-    if not lm or len(lm) < 21:
+    lm = _as_landmarks(lm)
+    if lm is None:
         return False
-    
-    fingers = fingers_up(lm)
-    return fingers[1] and fingers[2] and not fingers[3] and not fingers[4]
+    return _is_peace_sign(lm)
 
 
 def is_pointing(lm):
     """Detect pointing gesture (only index finger up)"""
-    if not lm or len(lm) < 21:
+    lm = _as_landmarks(lm)
+    if lm is None:
         return False
-    
-    fingers = fingers_up(lm)
-    return fingers[1] and not any([fingers[0], fingers[2], fingers[3], fingers[4]])
+    return _is_pointing(lm)
 
 
 def get_palm_center(lm):
     """Get center of palm for positioning"""
-    if not lm or len(lm) < 21:
+    lm = _as_landmarks(lm)
+    if lm is None:
         return None
-    
-    # Average of key palm points
-    palm_points = [0, 5, 9, 13, 17]  # Base of each finger
-    avg_x = sum(lm[i][1] for i in palm_points) / len(palm_points)
-    avg_y = sum(lm[i][2] for i in palm_points) / len(palm_points)
-    
-    return (int(avg_x), int(avg_y))
+    return _palm_center(lm)
 
 
 def get_hand_rotation(lm):
@@ -107,32 +255,18 @@ def get_hand_rotation(lm):
     Get approximate hand rotation angle
     Returns angle in degrees
     """
-    if not lm or len(lm) < 21:
+    lm = _as_landmarks(lm)
+    if lm is None:
         return 0
-    
-    # Use wrist and middle finger base
-    wrist = lm[0][1:]
-    middle_base = lm[9][1:]
-    
-    dx = middle_base[0] - wrist[0]
-    dy = middle_base[1] - wrist[1]
-    
-    angle = math.degrees(math.atan2(dy, dx))
-    return angle
+    return _hand_rotation(lm)
 
 
 def is_thumbs_up(lm):
     """Detect thumbs up gesture"""
-    if not lm or len(lm) < 21:
+    lm = _as_landmarks(lm)
+    if lm is None:
         return False
-    
-    fingers = fingers_up(lm)
-    
-    # Thumb up, all others down
-    # Also check thumb is above wrist
-    thumb_above_wrist = lm[4][2] < lm[0][2]
-    
-    return fingers[0] and not any(fingers[1:]) and thumb_above_wrist
+    return _is_thumbs_up(lm)
 
 
 def get_gesture_confidence(lm, gesture_type="point"):
@@ -140,30 +274,22 @@ def get_gesture_confidence(lm, gesture_type="point"):
     Return confidence score for a gesture (0-1)
     Useful for filtering out uncertain gestures
     """
-    if not lm or len(lm) < 21:
+    lm = _as_landmarks(lm)
+    if lm is None:
         return 0.0
-    
-    fingers = fingers_up(lm)
-    
+
     if gesture_type == "point":
-        # Only index should be up
-        if fingers[1] and not any([fingers[0], fingers[2], fingers[3], fingers[4]]):
-            # Check if index is really extended
-            index_tip = lm[8][2]
-            index_base = lm[5][2]
-            extension = abs(index_base - index_tip)
-            return min(1.0, extension / 100)
-    
+        return _point_confidence(lm)
     elif gesture_type == "palm":
-        # All fingers should be up
-        if all(fingers):
-            return 1.0
-        elif sum(fingers) >= 4:
-            return 0.7
-    
+        return _palm_confidence(lm)
+
     return 0.0
 
 
+def _has_index_tip(lm):
+    return lm is not None and len(lm) > 8
+
+
 def detect_swipe(lm_history, direction="horizontal", threshold=100):
     """
     Detect swipe gestures based on hand movement history
@@ -172,17 +298,28 @@ def detect_swipe(lm_history, direction="horizontal", threshold=100):
     """
     if not lm_history or len(lm_history) < 2:
         return False
-    
+
     # Use index finger tip for tracking
-    first_pos = lm_history[0][8][1:] if lm_history[0] else None
-    last_pos = lm_history[-1][8][1:] if lm_history[-1] else None
-    
-    if not first_pos or not last_pos:
+    if not _has_index_tip(lm_history[0]) or not _has_index_tip(lm_history[-1]):
         return False
-    
+    first_pos = lm_history[0][8]
+    last_pos = lm_history[-1][8]
+
     if direction == "horizontal":
         movement = abs(last_pos[0] - first_pos[0])
     else:  # vertical
         movement = abs(last_pos[1] - first_pos[1])
-    
-    return movement > threshold
\ No newline at end of file
+
+    return movement > threshold
+
+
+def _warm_up():
+    """Run the gesture and distance kernels once on a zeroed hand"""
+    lm = np.zeros((21, 3), dtype=np.int32)
+    _evaluate_gestures(lm)
+    _finger_distance_sq(lm, 4, 8)
+    distance(lm[4], lm[8])
+    distance_sq(lm[4], lm[8])
+
+
+_warm_up()
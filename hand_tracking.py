@@ -1,3 +1,6 @@
+import time
+from collections import deque
+
 import cv2
 import mediapipe as mp
 from mediapipe.tasks import python
@@ -5,13 +8,40 @@ from mediapipe.tasks.python import vision
 import numpy as np
 
 
+# Landmark pairs joined by draw_landmarks
+_HAND_CONNECTIONS = (
+    # Thumb
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    # Index
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    # Middle
+    (0, 9), (9, 10), (10, 11), (11, 12),
+    # Ring
+    (0, 13), (13, 14), (14, 15), (15, 16),
+    # Pinky
+    (0, 17), (17, 18), (18, 19), (19, 20),
+    # Palm
+    (5, 9), (9, 13), (13, 17)
+)
+
+# Per-landmark (color, radius): different colors for different parts
+_LM_STYLE = [((0, 255, 0), 4)] * 21  # Green
+for _i in (4, 8, 12, 16, 20):  # Fingertips
+    _LM_STYLE[_i] = ((0, 0, 255), 6)  # Red
+_LM_STYLE[0] = ((255, 0, 0), 8)  # Wrist, blue
+del _i
+
+
 class HandTracker:
-    def __init__(self, mode='performance'):
+    def __init__(self, mode='performance', input_size=None):
         """
         Initialize hand tracker with configurable modes
         
         Args:
             mode: 'performance' (fast, lower accuracy) or 'quality' (slower, higher accuracy)
+            input_size: Optional (width, height) frames are downscaled to before
+                inference; landmarks are normalized, so they still map onto
+                the full-resolution frame
         """
         # Configuration based on mode
         if mode == 'quality':
@@ -30,6 +60,9 @@ class HandTracker:
 
             options = vision.HandLandmarkerOptions(
                 base_options=base_options,
+                # VIDEO mode tracks the hand between frames instead of
+                # re-running palm detection on every image
+                running_mode=vision.RunningMode.VIDEO,
                 num_hands=1,  # Single hand for better performance
                 min_hand_detection_confidence=detection_conf,
                 min_hand_presence_confidence=presence_conf,
@@ -38,18 +71,25 @@ class HandTracker:
 
             self.detector = vision.HandLandmarker.create_from_options(options)
             self.results = None
+            self.input_size = tuple(input_size) if input_size else None
+            self._small_buf = None  # Reused downscale target
+            self._rgb_buf = None  # Reused BGR->RGB conversion target
+            # Landmark slots filled in place by get_landmarks every frame
+            self._coords_buf = np.empty((21, 3), dtype=np.float64)
+            self._lm_buf = np.empty((21, 3), dtype=np.int32)
+            self._last_timestamp_ms = -1
             
             # Tracking state
             self.last_landmarks = None
             self.hand_detected = False
-            self.detection_history = []
             self.history_size = 5
+            self.detection_history = deque(maxlen=self.history_size)
             
             # Performance metrics
             self.detection_count = 0
             self.failed_detections = 0
             
-            # Stability tracking
+            # Stability tracking (float32 (21, 3) EMA accumulator)
             self.stable_landmarks = None
             self.stability_alpha = 0.3  # Exponential moving average factor
             
@@ -76,16 +116,51 @@ class HandTracker:
             self.results = None
             self.hand_detected = False
             return
+
+        try:
+            # The models run on 224x224 / 192x192 crops internally, so a
+            # downscaled frame loses nothing and is far cheaper to process
+            if self.input_size is not None and img.shape[1::-1] != self.input_size:
+                w, h = self.input_size
+                if self._small_buf is None or self._small_buf.shape != (h, w, img.shape[2]):
+                    self._small_buf = np.empty((h, w, img.shape[2]), dtype=img.dtype)
+                cv2.resize(img, self.input_size, dst=self._small_buf,
+                           interpolation=cv2.INTER_AREA)
+                img = self._small_buf
+
+            # Convert BGR to RGB (MediaPipe expects RGB) into a reused buffer
+            if self._rgb_buf is None or self._rgb_buf.shape != img.shape:
+                self._rgb_buf = np.empty_like(img)
+            cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        except Exception as e:
+            print(f"Detection error: {e}")
+            self.results = None
+            self.hand_detected = False
+            return
+
+        self.detect_rgb(self._rgb_buf)
+
+    def detect_rgb(self, rgb):
+        """
+        Detect hand landmarks in an image that is already RGB
+        
+        Args:
+            rgb: RGB uint8 image (skips the BGR->RGB conversion)
+        """
+        # Check if detector is initialized
+        if not hasattr(self, 'detector') or self.detector is None:
+            self.results = None
+            self.hand_detected = False
+            return
         
         try:
-            # Convert BGR to RGB (MediaPipe expects RGB)
-            rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            
             # Create MediaPipe Image object
             mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
             
             # Detect hand landmarks
-            self.results = self.detector.detect(mp_image)
+            self.results = self.detector.detect_for_video(
+                mp_image, self._next_timestamp_ms()
+            )
             
             # Update detection state
             if self.results and self.results.hand_landmarks:
@@ -96,16 +171,20 @@ class HandTracker:
                 self.hand_detected = False
                 self.failed_detections += 1
                 self.detection_history.append(False)
-            
-            # Keep history size limited
-            if len(self.detection_history) > self.history_size:
-                self.detection_history.pop(0)
                 
         except Exception as e:
             print(f"Detection error: {e}")
             self.results = None
             self.hand_detected = False
 
+    def _next_timestamp_ms(self):
+        """Frame timestamp for VIDEO mode, which requires increasing values"""
+        timestamp_ms = int(time.monotonic() * 1000)
+        if timestamp_ms <= self._last_timestamp_ms:
+            timestamp_ms = self._last_timestamp_ms + 1
+        self._last_timestamp_ms = timestamp_ms
+        return timestamp_ms
+
     def get_landmarks(self, img):
         """
         Get processed hand landmarks with stability filtering
@@ -114,40 +193,32 @@ class HandTracker:
             img: BGR image (for dimension reference)
             
         Returns:
-            List of (id, x, y) tuples or None if no hand detected
+            (ok, landmarks): ok is False if no hand detected. landmarks is
+            the tracker's int32 (21, 3) buffer of (x, y, z) pixel rows (row
+            index is the landmark id; z is relative depth scaled by the
+            image width); it is overwritten on the next call, so copy it
+            to keep it
         """
         if not self.results or not self.results.hand_landmarks:
             self.stable_landmarks = None
-            return None
+            return False, self._lm_buf
 
-        h, w, _ = img.shape
-        lm_list = []
-
-        # Extract landmarks
-        for i, lm in enumerate(self.results.hand_landmarks[0]):
-            cx, cy = int(lm.x * w), int(lm.y * h)
-            lm_list.append((i, cx, cy))
+        lm_buf = self._to_pixel_array(self.results.hand_landmarks[0], img,
+                                      self._coords_buf, self._lm_buf)
 
         # Apply stability filter (exponential moving average)
         if self.stable_landmarks is None:
-            self.stable_landmarks = lm_list
+            self.stable_landmarks = lm_buf.astype(np.float32)
         else:
-            stabilized = []
-            for i in range(len(lm_list)):
-                old_id, old_x, old_y = self.stable_landmarks[i]
-                new_id, new_x, new_y = lm_list[i]
-                
-                # Smooth position using exponential moving average
-                smooth_x = int(old_x * (1 - self.stability_alpha) + new_x * self.stability_alpha)
-                smooth_y = int(old_y * (1 - self.stability_alpha) + new_y * self.stability_alpha)
-                
-                stabilized.append((new_id, smooth_x, smooth_y))
-            
-            self.stable_landmarks = stabilized
-            lm_list = stabilized
+            # Smooth all positions at once, keeping sub-pixel precision
+            # between frames and truncating only into the returned buffer
+            self.stable_landmarks += self.stability_alpha * np.subtract(
+                lm_buf, self.stable_landmarks, dtype=np.float32
+            )
+            np.copyto(lm_buf, self.stable_landmarks, casting='unsafe')
 
-        self.last_landmarks = lm_list
-        return lm_list
+        self.last_landmarks = lm_buf
+        return True, lm_buf
 
     def get_raw_landmarks(self, img):
         """
@@ -157,14 +228,31 @@ class HandTracker:
         if not self.results or not self.results.hand_landmarks:
             return None
 
-        h, w, _ = img.shape
-        lm_list = []
+        return self._to_pixel_array(self.results.hand_landmarks[0], img)
 
-        for i, lm in enumerate(self.results.hand_landmarks[0]):
-            cx, cy = int(lm.x * w), int(lm.y * h)
-            lm_list.append((i, cx, cy))
+    @staticmethod
+    def _to_pixel_array(hand_landmarks, img, coords=None, out=None):
+        """
+        Convert normalized MediaPipe landmarks to an int32 (x, y, z) pixel array
+        Fills the given float64 coords scratch and int32 out buffers in place
+        when provided, otherwise allocates new ones
+        """
+        h, w, _ = img.shape
+        if coords is None:
+            coords = np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks], dtype=np.float64)
+        else:
+            for row, lm in zip(coords, hand_landmarks):
+                row[0] = lm.x
+                row[1] = lm.y
+                row[2] = lm.z
 
-        return lm_list
+        # Single vectorized scale + truncating cast (same as int() per value);
+        # MediaPipe's z uses roughly the same scale as x
+        np.multiply(coords, (w, h, w), out=coords)
+        if out is None:
+            return coords.astype(np.int32)
+        np.copyto(out, coords, casting='unsafe')
+        return out
 
     def is_hand_stable(self):
         """
@@ -205,50 +293,22 @@ class HandTracker:
         if landmarks is None:
             landmarks = self.last_landmarks
         
-        if not landmarks:
+        if landmarks is None or len(landmarks) == 0:
             return img
 
+        # Plain int (x, y) tuples, converted once for all OpenCV calls
+        points = [tuple(p) for p in np.asarray(landmarks)[:, :2].tolist()]
+
         # Draw connections first (so they appear behind points)
         if draw_connections:
-            connections = [
-                # Thumb
-                (0, 1), (1, 2), (2, 3), (3, 4),
-                # Index
-                (0, 5), (5, 6), (6, 7), (7, 8),
-                # Middle
-                (0, 9), (9, 10), (10, 11), (11, 12),
-                # Ring
-                (0, 13), (13, 14), (14, 15), (15, 16),
-                # Pinky
-                (0, 17), (17, 18), (18, 19), (19, 20),
-                # Palm
-                (5, 9), (9, 13), (13, 17)
-            ]
-            
-            for connection in connections:
-                start_idx, end_idx = connection
-                if start_idx < len(landmarks) and end_idx < len(landmarks):
-                    start = (landmarks[start_idx][1], landmarks[start_idx][2])
-                    end = (landmarks[end_idx][1], landmarks[end_idx][2])
-                    cv2.line(img, start, end, (0, 255, 0), 2)
+            for start_idx, end_idx in _HAND_CONNECTIONS:
+                if start_idx < len(points) and end_idx < len(points):
+                    cv2.line(img, points[start_idx], points[end_idx], (0, 255, 0), 2)
 
         # Draw landmark points
-        for i, lm in enumerate(landmarks):
-            _, x, y = lm
-            
-            # Different colors for different parts
-            if i in [4, 8, 12, 16, 20]:  # Fingertips
-                color = (0, 0, 255)  # Red
-                radius = 6
-            elif i == 0:  # Wrist
-                color = (255, 0, 0)  # Blue
-                radius = 8
-            else:
-                color = (0, 255, 0)  # Green
-                radius = 4
-            
-            cv2.circle(img, (x, y), radius, color, -1)
-            cv2.circle(img, (x, y), radius + 2, (255, 255, 255), 1)
+        for point, (color, radius) in zip(points, _LM_STYLE):
+            cv2.circle(img, point, radius, color, -1)
+            cv2.circle(img, point, radius + 2, (255, 255, 255), 1)
 
         return img
 
@@ -262,19 +322,15 @@ class HandTracker:
         if landmarks is None:
             landmarks = self.last_landmarks
         
-        if not landmarks:
+        if landmarks is None or len(landmarks) == 0:
             return None
 
-        xs = [lm[1] for lm in landmarks]
-        ys = [lm[2] for lm in landmarks]
-        
-        x_min, x_max = min(xs), max(xs)
-        y_min, y_max = min(ys), max(ys)
+        landmarks = np.asarray(landmarks)[:, :2]
         
         # Add padding
         padding = 20
-        x_min = max(0, x_min - padding)
-        y_min = max(0, y_min - padding)
+        x_min, y_min = np.maximum(landmarks.min(axis=0) - padding, 0).tolist()
+        x_max, y_max = landmarks.max(axis=0).tolist()
         
         w = x_max - x_min + 2 * padding
         h = y_max - y_min + 2 * padding
@@ -1,18 +1,177 @@
 import cv2
+import sys
 import time
+import queue
+import threading
 import numpy as np
-from typing import Optional, Tuple
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
 
 from hand_tracking import HandTracker
-from gesture_controller import fingers_up, is_pinch, distance
+from gesture_controller import evaluate_gestures
 from canvas import Canvas
 
 # ---------------- CONFIG ----------------
 WIDTH, HEIGHT = 1280, 720
 FPS_TARGET = 30
 FRAME_TIME = 1.0 / FPS_TARGET
-
-cap = cv2.VideoCapture(0)
+SMALL_W, SMALL_H = 640, 360  # Hand tracking input; drawing and UI stay full-res
+
+# Native capture backend per platform (the default can pick a slower one)
+if sys.platform.startswith("linux"):
+    CAMERA_BACKEND = cv2.CAP_V4L2
+elif sys.platform == "win32":
+    CAMERA_BACKEND = cv2.CAP_DSHOW
+else:
+    CAMERA_BACKEND = cv2.CAP_ANY
+
+
+# ---------------- CAMERA ----------------
+class LatestFrameCapture:
+    """
+    Reads a cv2.VideoCapture on a daemon thread and keeps only the newest
+    frame, so driver-side buffering never adds latency while the main loop
+    is busy with inference. Every frame is decoded as it arrives, so read()
+    returns the newest one immediately when the caller is behind. Three
+    reused buffers rotate between the reader, the newest frame and the
+    caller: a frame returned by read() is valid until the next read().
+    frame_time is the time.monotonic() at which that frame was decoded.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture):
+        self.cap = cap
+        self._cond = threading.Condition()
+        self._back: Optional[np.ndarray] = None   # Being decoded into by the reader
+        self._ready: Optional[np.ndarray] = None  # Newest decoded frame
+        self._front: Optional[np.ndarray] = None  # Last frame handed out by read()
+        self._fresh = False  # _ready holds a frame read() has not returned yet
+        self._ready_time = 0.0
+        self.frame_time = 0.0  # Decode time of the frame last returned by read()
+        self.stopped = False
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+
+    def start(self) -> "LatestFrameCapture":
+        self._thread.start()
+        return self
+
+    def _reader(self) -> None:
+        while not self.stopped:
+            ret, frame = self.cap.read(self._back)
+            with self._cond:
+                if not ret:
+                    self.stopped = True
+                else:
+                    # Publish the frame; the buffer it replaces becomes the
+                    # next decode target, never the one the caller holds
+                    self._back, self._ready = self._ready, frame
+                    self._ready_time = time.monotonic()
+                    self._fresh = True
+                self._cond.notify_all()
+
+    def read(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        """Wait for a frame newer than the last one returned (like cap.read())"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._fresh or self.stopped, timeout)
+            if not self._fresh:
+                return False, None
+            self._front, self._ready = self._ready, self._front
+            self.frame_time = self._ready_time
+            self._fresh = False
+            return True, self._front
+
+    def release(self) -> None:
+        self.stopped = True
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self.cap.release()
+
+
+class InferencePipeline:
+    """
+    Runs flip + hand tracking on its own thread so inference on one frame
+    overlaps compositing and display of the previous one. Results go to a
+    one-slot queue that drops the older entry when full, so the consumer
+    always gets the newest frame; a None entry means the camera stopped.
+    GUI calls stay on the main thread.
+
+    Frames are flipped into a small pool of reused buffers; the consumer
+    hands each frame back with recycle() once it has been displayed.
+    """
+
+    def __init__(self, camera: LatestFrameCapture, tracker: HandTracker,
+                 maxsize: int = 1):
+        self.camera = camera
+        self.tracker = tracker
+        self.results: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._free: "queue.Queue" = queue.Queue()  # Recycled frame buffers
+        self.stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "InferencePipeline":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            while not self.stopped:
+                success, img = self.camera.read()
+                captured_at = self.camera.frame_time
+                if not success:
+                    if self.camera.stopped:
+                        break
+                    continue  # No new frame yet
+
+                img = cv2.flip(img, 1, dst=self._take_buffer(img.shape))
+                self.tracker.detect(img)
+                ok, lm = self.tracker.get_landmarks(img)
+                # The tracker reuses its landmark buffer every frame
+                self._put((img, lm.copy() if ok else None, captured_at))
+        finally:
+            self._put(None)
+
+    def _take_buffer(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """A free frame buffer, allocating only while the pool warms up"""
+        try:
+            buf = self._free.get_nowait()
+        except queue.Empty:
+            buf = None
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+        return buf
+
+    def _put(self, item) -> None:
+        """Queue a result, dropping the oldest one if the consumer is behind"""
+        try:
+            self.results.put_nowait(item)
+        except queue.Full:
+            try:
+                dropped = self.results.get_nowait()
+                if dropped is not None:
+                    self.recycle(dropped[0])
+            except queue.Empty:
+                pass
+            self.results.put_nowait(item)
+
+    def recycle(self, img: np.ndarray) -> None:
+        """Return a frame from get() to the buffer pool once it is no longer used"""
+        self._free.put(img)
+
+    def get(self):
+        """Next (img, lm, captured_at) result, or None once the camera has stopped"""
+        return self.results.get()
+
+    def stop(self) -> None:
+        self.stopped = True
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+
+
+cap = cv2.VideoCapture(0, CAMERA_BACKEND)
+if not cap.isOpened() and CAMERA_BACKEND != cv2.CAP_ANY:
+    cap = cv2.VideoCapture(0)  # Fall back to OpenCV's default backend
+# Compressed MJPG frames instead of raw YUY2: less USB bandwidth and no
+# per-frame YUV->BGR conversion; set before the size, which it constrains
+cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize driver-side queuing
 cap.set(cv2.CAP_PROP_FRAME_WIDTH, WIDTH)
 cap.set(cv2.CAP_PROP_FRAME_HEIGHT, HEIGHT)
 cap.set(cv2.CAP_PROP_FPS, FPS_TARGET)
@@ -26,7 +185,7 @@ if not cap.isOpened():
     exit(1)
 
 try:
-    tracker = HandTracker(mode='performance')
+    tracker = HandTracker(mode='performance', input_size=(SMALL_W, SMALL_H))
 except Exception as e:
     print(f"\nFailed to initialize hand tracker: {e}")
     print("\nTo fix this, run one of these commands:")
@@ -36,6 +195,8 @@ except Exception as e:
     exit(1)
 
 canvas = Canvas(WIDTH, HEIGHT)
+camera = LatestFrameCapture(cap)
+pipeline = InferencePipeline(camera, tracker)
 
 DEBUG_MODE = False
 show_stats = False
@@ -48,6 +209,28 @@ BUTTON_WIDTH = 100
 MARGIN = 15
 START_Y = 15
 
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+LIGHT_GRAY = (200, 200, 200)
+HEADING = (255, 255, 0)
+STATS_COLOR = (0, 255, 255)
+FPS_GOOD = (0, 255, 0)
+FPS_LOW = (0, 165, 255)
+
+INSTRUCTIONS = [
+    ("Gestures:", HEADING),
+    ("  Open palm (5 fingers) - Clear", LIGHT_GRAY),
+    ("  Index finger - Draw/Click", LIGHT_GRAY),
+    ("  Pinch - Eraser mode", LIGHT_GRAY),
+    ("  3 fingers - Next color", LIGHT_GRAY),
+    ("  Thumb + Pinky - Undo", LIGHT_GRAY),
+    ("", BLACK),
+    ("Keys:", HEADING),
+    ("  D - Debug | S - Stats", LIGHT_GRAY),
+    ("  I - Instructions | ESC - Exit", LIGHT_GRAY)
+]
+
 COLORS = [
     ("BLUE", (255, 0, 0)),
     ("GREEN", (0, 255, 0)),
@@ -56,15 +239,34 @@ COLORS = [
     ("PURPLE", (255, 0, 255)),
     ("ORANGE", (0, 165, 255)),
     ("CYAN", (255, 255, 0)),
-    ("WHITE", (255, 255, 255))
+    ("WHITE", WHITE)
+]
+
+# Toolbar buttons in layout order: the colors, then ERASER, CLEAR and UNDO
+BUTTONS = COLORS + [
+    ("ERASER", (100, 100, 100)),
+    ("CLEAR", (180, 0, 0)),
+    ("UNDO", (0, 120, 180))
 ]
 
+# Fixed toolbar geometry: (x1, y1, x2, y2), edges inclusive, per button
+BUTTON_RECTS = np.array([
+    [x, START_Y, x + BUTTON_WIDTH, START_Y + BUTTON_HEIGHT]
+    for x in range(MARGIN, MARGIN + len(BUTTONS) * (BUTTON_WIDTH + MARGIN),
+                   BUTTON_WIDTH + MARGIN)
+], dtype=np.int32)
+
 color_index = 0
 canvas.current_color = COLORS[color_index][1]
 
 current_tool = "DRAW"
-gesture_cooldown = 0
-button_click_cooldown = 0
+# Cooldowns are time.monotonic() deadlines, so they last the same at any
+# frame rate (durations match the old frame counts at FPS_TARGET)
+BUTTON_COOLDOWN = 15 / FPS_TARGET
+CLEAR_COOLDOWN = 30 / FPS_TARGET
+GESTURE_COOLDOWN = 20 / FPS_TARGET
+gesture_deadline = 0.0
+button_click_deadline = 0.0
 
 DRAWING_ZONE_Y = UI_HEIGHT + 10
 
@@ -84,110 +286,199 @@ def draw_button(img: np.ndarray, x: int, y: int, w: int, h: int,
     cv2.rectangle(img, (x, y), (x+w, y+h), btn_color, -1)
 
     if active:
-        cv2.rectangle(img, (x-2, y-2), (x+w+2, y+h+2), (255, 255, 255), 3)
+        cv2.rectangle(img, (x-2, y-2), (x+w+2, y+h+2), WHITE, 3)
         cv2.rectangle(img, (x, y), (x+w, y+h), (200, 200, 200), 2)
 
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    font_scale = 0.5 if len(text) > 6 else 0.6
-    text_size = cv2.getTextSize(text, font, font_scale, 2)[0]
-    text_x = x + (w - text_size[0]) // 2
-    text_y = y + (h + text_size[1]) // 2
-
-    cv2.putText(img, text, (text_x+1, text_y+1), font, font_scale, (0, 0, 0), 2)
-    cv2.putText(img, text, (text_x, text_y), font, font_scale, (255, 255, 255), 2)
-
+    # Label is a pre-rendered sprite (shadow + white text)
+    sprite, (text_w, text_h) = label_sprite(text)
+    text_x = x + (w - text_w) // 2
+    text_y = y + (h + text_h) // 2
+    blit_layer(img, sprite, text_x - LABEL_PAD, text_y - text_h - LABEL_PAD)
+
+
+def tint_roi(img: np.ndarray, x1: int, y1: int, x2: int, y2: int,
+             color: Tuple[int, int, int], alpha: float) -> None:
+    """
+    Blend a solid color over a rectangle in place (corners inclusive, like
+    cv2.rectangle); same result as drawing it on a full-frame copy and
+    addWeighted-ing that back, without touching the rest of the frame
+    """
+    roi = img[max(y1, 0):y2 + 1, max(x1, 0):x2 + 1]
+    cv2.addWeighted(np.full_like(roi, color), alpha, roi, 1 - alpha, 0, dst=roi)
+
+
+def hovered_button(x: Optional[int], y: Optional[int]) -> Optional[int]:
+    """Index of the toolbar button under (x, y): colors, then ERASER/CLEAR/UNDO"""
+    if x is None or y is None:
+        return None
+    # One inside-test against every button rect at once
+    hits = ((BUTTON_RECTS[:, 0] <= x) & (x <= BUTTON_RECTS[:, 2]) &
+            (BUTTON_RECTS[:, 1] <= y) & (y <= BUTTON_RECTS[:, 3]))
+    return int(hits.argmax()) if hits.any() else None
+
+
+# ---------------- UI LAYER CACHE ----------------
+# Buttons and panel text are rendered once per UI state into layers that are
+# copied onto each frame; only the translucent backgrounds are blended live
+class UILayer(NamedTuple):
+    x: int
+    y: int
+    color: np.ndarray       # Layer pixels as rendered over black
+    opaque: np.ndarray      # HxW uint8 cv2 mask, 1 where the layer fully covers
+    edge_ys: np.ndarray     # Partially covered (anti-aliased) pixels...
+    edge_xs: np.ndarray
+    edge_color: np.ndarray  # ...their color over black
+    edge_keep: np.ndarray   # ...and how much of the frame shows through (0-255)
+
+
+MAX_CACHED_LAYERS = 64
+_info_cache: Dict[tuple, UILayer] = {}
+_instructions_cache: Dict[tuple, UILayer] = {}
+
+
+def render_layer(draw: Callable[[np.ndarray], None],
+                 x1: int, y1: int, x2: int, y2: int) -> UILayer:
+    """
+    Render draw(img) over black and over white into region-sized scratch
+    images; draw() paints in region-local coordinates (origin at x1, y1).
+    Identical pixels were painted solid; pixels that differ by less than
+    the full range are anti-aliased edges, and the difference is how much
+    of the background shows through them
+    """
+    over_black, over_white = [np.full((y2 - y1, x2 - x1, 3), background, dtype=np.uint8)
+                              for background in (0, 255)]
+    draw(over_black)
+    draw(over_white)
+    keep = over_white.astype(np.int16) - over_black
+    # Per-channel reductions spelled out: much cheaper than all/any(axis=2)
+    k0, k1, k2 = keep[..., 0], keep[..., 1], keep[..., 2]
+    opaque = (k0 | k1 | k2) == 0
+    edge_ys, edge_xs = np.nonzero(~opaque & (np.minimum(np.minimum(k0, k1), k2) < 255))
+    return UILayer(x1, y1, over_black, opaque.astype(np.uint8), edge_ys, edge_xs,
+                   over_black[edge_ys, edge_xs].astype(np.uint16),
+                   keep[edge_ys, edge_xs].astype(np.uint16))
+
+
+def cached_layer(cache: Dict[tuple, UILayer], key: tuple,
+                 render: Callable[[], UILayer]) -> UILayer:
+    layer = cache.get(key)
+    if layer is None:
+        if len(cache) >= MAX_CACHED_LAYERS:
+            cache.clear()
+        layer = cache[key] = render()
+    return layer
+
+
+def blit_layer(img: np.ndarray, layer: UILayer,
+               x: Optional[int] = None, y: Optional[int] = None) -> None:
+    """Composite a layer at its own position, or at (x, y) if given"""
+    x = layer.x if x is None else x
+    y = layer.y if y is None else y
+    h, w = layer.opaque.shape
+    roi = img[y:y+h, x:x+w]
+    # Masked overwrite of the destination in a single pass
+    cv2.copyTo(layer.color, layer.opaque, roi)
+    if len(layer.edge_ys):
+        under = roi[layer.edge_ys, layer.edge_xs].astype(np.uint16)
+        roi[layer.edge_ys, layer.edge_xs] = (
+            layer.edge_color + (under * layer.edge_keep + 127) // 255
+        ).astype(np.uint8)
+
+
+# ---------------- LABEL SPRITES ----------------
+LABEL_PAD = 3  # Room around the text box for stroke width, shadow and AA
+_label_sprites: Dict[str, Tuple[UILayer, Tuple[int, int]]] = {}
+
+
+def label_sprite(text: str) -> Tuple[UILayer, Tuple[int, int]]:
+    """Button label rendered once into a sprite; returns (sprite, text size)"""
+    sprite = _label_sprites.get(text)
+    if sprite is None:
+        font_scale = 0.5 if len(text) > 6 else 0.6
+        (text_w, text_h), baseline = cv2.getTextSize(text, FONT, font_scale, 2)
+        origin_x, origin_y = LABEL_PAD, LABEL_PAD + text_h
+
+        def draw(scratch: np.ndarray) -> None:
+            cv2.putText(scratch, text, (origin_x+1, origin_y+1), FONT, font_scale, BLACK, 2)
+            cv2.putText(scratch, text, (origin_x, origin_y), FONT, font_scale, WHITE, 2)
+
+        layer = render_layer(draw, 0, 0, text_w + 2 * LABEL_PAD + 1,
+                             text_h + baseline + 2 * LABEL_PAD + 1)
+        sprite = _label_sprites[text] = (layer, (text_w, text_h))
+    return sprite
+
+
+# Rasterize every toolbar label at startup
+for _label, _ in BUTTONS:
+    label_sprite(_label)
+
+
+# ---------------- BUTTON SPRITES ----------------
+# Room around a button for its active border (3px) and drop shadow (+3px)
+BUTTON_PAD = 4
+
+
+def render_button_sprite(button_id: int, active: bool, hover: bool) -> UILayer:
+    """Fully composed button (shadow, body, border, label) for one state"""
+    x1, y1, x2, y2 = BUTTON_RECTS[button_id].tolist()
+    name, color = BUTTONS[button_id]
+    return render_layer(
+        lambda scratch: draw_button(scratch, BUTTON_PAD, BUTTON_PAD, BUTTON_WIDTH,
+                                    BUTTON_HEIGHT, name, color, active=active, hover=hover),
+        x1 - BUTTON_PAD, y1 - BUTTON_PAD, x2 + BUTTON_PAD + 1, y2 + BUTTON_PAD + 1)
+
+
+# BUTTON_SPRITES[button_id][active][hover], all rendered at startup
+BUTTON_SPRITES = [
+    [[render_button_sprite(i, active, hover) for hover in (False, True)]
+     for active in (False, True)]
+    for i in range(len(BUTTONS))
+]
 
-def is_hovering_button(x: int, y: int, btn_x: int, btn_y: int,
-                       btn_w: int, btn_h: int) -> bool:
-    return btn_x <= x <= btn_x + btn_w and btn_y <= y <= btn_y + btn_h
+# Separator under the toolbar (2px wide line at UI_HEIGHT, local y 2)
+SEPARATOR_LAYER = render_layer(
+    lambda scratch: cv2.line(scratch, (0, 2), (WIDTH, 2), (100, 100, 100), 2),
+    0, UI_HEIGHT - 2, WIDTH, UI_HEIGHT + 3)
 
 
 def draw_ui(img: np.ndarray, hover_x: Optional[int] = None,
             hover_y: Optional[int] = None) -> None:
-    overlay = img.copy()
-    cv2.rectangle(overlay, (0, 0), (WIDTH, UI_HEIGHT), (30, 30, 30), -1)
-    cv2.addWeighted(overlay, 0.85, img, 0.15, 0, img)
-
-    cv2.line(img, (0, UI_HEIGHT), (WIDTH, UI_HEIGHT), (100, 100, 100), 2)
-
-    x = MARGIN
-
-    for i, (name, color) in enumerate(COLORS):
-        is_hover = False
-        if hover_x is not None and hover_y is not None:
-            is_hover = is_hovering_button(hover_x, hover_y, x, START_Y, BUTTON_WIDTH, BUTTON_HEIGHT)
-
-        is_active = (i == color_index and current_tool == "DRAW")
-
-        draw_button(
-            img, x, START_Y, BUTTON_WIDTH, BUTTON_HEIGHT,
-            name, color, active=is_active, hover=is_hover
-        )
-        x += BUTTON_WIDTH + MARGIN
-
-    is_hover = False
-    if hover_x is not None and hover_y is not None:
-        is_hover = is_hovering_button(hover_x, hover_y, x, START_Y, BUTTON_WIDTH, BUTTON_HEIGHT)
-
-    draw_button(img, x, START_Y, BUTTON_WIDTH, BUTTON_HEIGHT,
-                "ERASER", (100, 100, 100),
-                active=(current_tool == "ERASE"), hover=is_hover)
-    x += BUTTON_WIDTH + MARGIN
-
-    is_hover = False
-    if hover_x is not None and hover_y is not None:
-        is_hover = is_hovering_button(hover_x, hover_y, x, START_Y, BUTTON_WIDTH, BUTTON_HEIGHT)
-
-    draw_button(img, x, START_Y, BUTTON_WIDTH, BUTTON_HEIGHT,
-                "CLEAR", (180, 0, 0), hover=is_hover)
-    x += BUTTON_WIDTH + MARGIN
-
-    is_hover = False
-    if hover_x is not None and hover_y is not None:
-        is_hover = is_hovering_button(hover_x, hover_y, x, START_Y, BUTTON_WIDTH, BUTTON_HEIGHT)
-
-    draw_button(img, x, START_Y, BUTTON_WIDTH, BUTTON_HEIGHT,
-                "UNDO", (0, 120, 180), hover=is_hover)
+    tint_roi(img, 0, 0, WIDTH, UI_HEIGHT, (30, 30, 30), 0.85)
+    blit_layer(img, SEPARATOR_LAYER)
+
+    hovered_id = hovered_button(hover_x, hover_y)
+    eraser_id = len(COLORS)
+    for i, states in enumerate(BUTTON_SPRITES):
+        if i < eraser_id:
+            active = (i == color_index and current_tool == "DRAW")
+        else:
+            active = (i == eraser_id and current_tool == "ERASE")
+        blit_layer(img, states[active][i == hovered_id])
 
 
 def check_buttons(x: int, y: int) -> bool:
-    global color_index, current_tool, button_click_cooldown
+    global color_index, current_tool, button_click_deadline
 
-    if button_click_cooldown > 0:
+    if time.monotonic() < button_click_deadline:
         return False
 
-    if y < START_Y or y > START_Y + BUTTON_HEIGHT:
+    button_id = hovered_button(x, y)
+    if button_id is None:
         return False
 
-    pos = MARGIN
-
-    for i in range(len(COLORS)):
-        if pos <= x <= pos + BUTTON_WIDTH:
-            color_index = i
-            canvas.current_color = COLORS[color_index][1]
-            current_tool = "DRAW"
-            button_click_cooldown = 15
-            return True
-        pos += BUTTON_WIDTH + MARGIN
-
-    if pos <= x <= pos + BUTTON_WIDTH:
+    if button_id < len(COLORS):
+        color_index = button_id
+        canvas.current_color = COLORS[color_index][1]
+        current_tool = "DRAW"
+    elif button_id == len(COLORS):
         current_tool = "ERASE"
-        button_click_cooldown = 15
-        return True
-    pos += BUTTON_WIDTH + MARGIN
-
-    if pos <= x <= pos + BUTTON_WIDTH:
+    elif button_id == len(COLORS) + 1:
         canvas.clear()
-        button_click_cooldown = 15
-        return True
-    pos += BUTTON_WIDTH + MARGIN
-
-    if pos <= x <= pos + BUTTON_WIDTH:
+    else:
         canvas.undo()
-        button_click_cooldown = 15
-        return True
 
-    return False
+    button_click_deadline = time.monotonic() + BUTTON_COOLDOWN
+    return True
 
 
 def draw_cursor(img: np.ndarray, x: int, y: int,
@@ -199,69 +490,64 @@ def draw_cursor(img: np.ndarray, x: int, y: int,
         cv2.circle(img, (x, y), canvas.brush_thickness // 2, canvas.current_color, 2)
         cv2.circle(img, (x, y), 3, canvas.current_color, -1)
     else:
-        cv2.circle(img, (x, y), 8, (255, 255, 255), 2)
+        cv2.circle(img, (x, y), 8, WHITE, 2)
         cv2.circle(img, (x, y), 3, (0, 200, 255), -1)
 
 
-def draw_info_panel(img: np.ndarray) -> None:
-    info_bg = img.copy()
-    panel_height = 100
-    cv2.rectangle(info_bg, (WIDTH - 300, HEIGHT - panel_height),
-                  (WIDTH - 10, HEIGHT - 10), (30, 30, 30), -1)
-    cv2.addWeighted(info_bg, 0.8, img, 0.2, 0, img)
+def draw_info_text(img: np.ndarray, tool: str, color_id: int, x: int, y: int) -> None:
+    """Tool and color lines of the info panel, first baseline at (x, y)"""
+    tool_text = f"Tool: {tool}"
+    cv2.putText(img, tool_text, (x, y), FONT, 0.5, WHITE, 1)
+
+    y += 20
+    color_name, color = COLORS[color_id]
+    cv2.putText(img, f"Color: {color_name}", (x, y), FONT, 0.5, WHITE, 1)
+    cv2.circle(img, (x + 185, y - 7), 10, color, -1)
+    cv2.circle(img, (x + 185, y - 7), 11, WHITE, 1)
 
-    y_offset = HEIGHT - panel_height + 25
-    font = cv2.FONT_HERSHEY_SIMPLEX
 
-    tool_text = f"Tool: {current_tool}"
-    cv2.putText(img, tool_text, (WIDTH - 285, y_offset), font, 0.5, (255, 255, 255), 1)
+def draw_info_panel(img: np.ndarray) -> None:
+    panel_height = 100
+    x1, y1, x2, y2 = WIDTH - 300, HEIGHT - panel_height, WIDTH - 10, HEIGHT - 10
+    text_x, text_y = WIDTH - 285, y1 + 25
+    tint_roi(img, x1, y1, x2, y2, (30, 30, 30), 0.8)
 
-    y_offset += 20
-    color_name = COLORS[color_index][0]
-    cv2.putText(img, f"Color: {color_name}", (WIDTH - 285, y_offset), font, 0.5, (255, 255, 255), 1)
-    cv2.circle(img, (WIDTH - 100, y_offset - 7), 10, canvas.current_color, -1)
-    cv2.circle(img, (WIDTH - 100, y_offset - 7), 11, (255, 255, 255), 1)
+    key = (current_tool, color_index)
+    blit_layer(img, cached_layer(_info_cache, key, lambda: render_layer(
+        lambda scratch: draw_info_text(scratch, *key, text_x - x1, text_y - y1),
+        x1, y1, x2, y2)))
 
-    y_offset += 20
+    # The brush size follows the pinch distance almost every frame, so it
+    # is drawn live rather than multiplying the cached layers
     size = canvas.eraser_thickness if current_tool == "ERASE" else canvas.brush_thickness
-    cv2.putText(img, f"Size: {size}px", (WIDTH - 285, y_offset), font, 0.5, (255, 255, 255), 1)
+    cv2.putText(img, f"Size: {size}px", (text_x, text_y + 40), FONT, 0.5, WHITE, 1)
 
 
 def draw_instructions(img: np.ndarray) -> None:
-    instructions = [
-        ("Gestures:", (255, 255, 0)),
-        ("  Open palm (5 fingers) - Clear", (200, 200, 200)),
-        ("  Index finger - Draw/Click", (200, 200, 200)),
-        ("  Pinch - Eraser mode", (200, 200, 200)),
-        ("  3 fingers - Next color", (200, 200, 200)),
-        ("  Thumb + Pinky - Undo", (200, 200, 200)),
-        ("", (0, 0, 0)),
-        ("Keys:", (255, 255, 0)),
-        ("  D - Debug | S - Stats", (200, 200, 200)),
-        ("  I - Instructions | ESC - Exit", (200, 200, 200))
-    ]
-
-    overlay = img.copy()
     panel_width = 350
-    panel_height = len(instructions) * 25 + 30
+    panel_height = len(INSTRUCTIONS) * 25 + 30
     start_x = WIDTH - panel_width - 20
     start_y = 120
 
-    cv2.rectangle(overlay, (start_x, start_y),
-                  (start_x + panel_width, start_y + panel_height),
-                  (20, 20, 20), -1)
-    cv2.addWeighted(overlay, 0.85, img, 0.15, 0, img)
+    tint_roi(img, start_x, start_y, start_x + panel_width, start_y + panel_height,
+             (20, 20, 20), 0.85)
+
+    # Fully static; the border is 2px wide so the layer extends 1px past it,
+    # putting the panel corner at local (1, 1)
+    def draw_text(scratch: np.ndarray) -> None:
+        cv2.rectangle(scratch, (1, 1), (1 + panel_width, 1 + panel_height),
+                      (100, 100, 100), 2)
 
-    cv2.rectangle(img, (start_x, start_y),
-                  (start_x + panel_width, start_y + panel_height),
-                  (100, 100, 100), 2)
+        y_offset = 1 + 25
+        for text, color in INSTRUCTIONS:
+            if text:
+                cv2.putText(scratch, text, (1 + 15, y_offset),
+                           FONT, 0.5, color, 1)
+            y_offset += 25
 
-    y_offset = start_y + 25
-    for text, color in instructions:
-        if text:
-            cv2.putText(img, text, (start_x + 15, y_offset),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-        y_offset += 25
+    blit_layer(img, cached_layer(_instructions_cache, (), lambda: render_layer(
+        draw_text, start_x - 1, start_y - 1,
+        start_x + panel_width + 2, start_y + panel_height + 2)))
 
 
 # ---------------- MAIN LOOP ----------------
@@ -282,41 +568,42 @@ print("=" * 60)
 fps_counter = 0
 fps_start_time = time.time()
 current_fps = 0
+fps_text = "FPS: 0"
+
+camera.start()
+pipeline.start()
 
 try:
     while True:
-        frame_start = time.time()
-
-        success, img = cap.read()
-        if not success:
+        # Flipped frame and its landmarks from the inference thread; blocking
+        # here paces the loop to the camera, so there is no extra sleep
+        result = pipeline.get()
+        if result is None:
             print("Failed to read from camera")
             break
-
-        img = cv2.flip(img, 1)
+        img, lm, captured_at = result
 
         fps_counter += 1
         if time.time() - fps_start_time >= 1.0:
             current_fps = fps_counter
+            fps_text = f"FPS: {current_fps}"  # Formatted once per second
             fps_counter = 0
             fps_start_time = time.time()
 
-        tracker.detect(img)
-        lm = tracker.get_landmarks(img)
-
         hover_x: Optional[int] = None
         hover_y: Optional[int] = None
         is_drawing = False
         is_eraser_mode = False
 
-        if lm:
-            fingers = fingers_up(lm)
-            x, y = lm[8][1], lm[8][2]
-            thumb = lm[4][1:]
-            index = lm[8][1:]
+        if lm is not None:
+            gestures = evaluate_gestures(lm, pinch_threshold=35)
+            fingers = gestures['fingers']
+            x, y = int(lm[8, 0]), int(lm[8, 1])
 
             hover_x, hover_y = x, y
 
-            d = distance(thumb, index)
+            # Thumb-index distance
+            d = gestures['pinch_distance']
             new_size = int(max(4, min(40, d / 3)))
             canvas.set_brush_size(new_size)
 
@@ -325,23 +612,23 @@ try:
             if fingers[1] and not fingers[2] and in_ui_zone:
                 check_buttons(x, y)
 
-            elif gesture_cooldown == 0:
+            elif time.monotonic() >= gesture_deadline:
                 if all(fingers):
                     canvas.clear()
-                    gesture_cooldown = 30
+                    gesture_deadline = time.monotonic() + CLEAR_COOLDOWN
 
                 elif fingers[1] and fingers[2] and fingers[3] and not fingers[0] and not fingers[4]:
                     color_index = (color_index + 1) % len(COLORS)
                     canvas.current_color = COLORS[color_index][1]
                     current_tool = "DRAW"
-                    gesture_cooldown = 20
+                    gesture_deadline = time.monotonic() + GESTURE_COOLDOWN
 
                 elif fingers[0] and fingers[4] and not fingers[1] and not fingers[2] and not fingers[3]:
                     canvas.undo()
-                    gesture_cooldown = 20
+                    gesture_deadline = time.monotonic() + GESTURE_COOLDOWN
 
             if fingers[1] and not fingers[2] and not in_ui_zone:
-                is_eraser_mode = (current_tool == "ERASE") or is_pinch(lm, threshold=35)
+                is_eraser_mode = (current_tool == "ERASE") or gestures['is_pinch']
                 canvas.draw(x, y, eraser=is_eraser_mode)
                 is_drawing = True
             else:
@@ -350,23 +637,20 @@ try:
         else:
             canvas.reset()
 
-        if gesture_cooldown > 0:
-            gesture_cooldown -= 1
-        if button_click_cooldown > 0:
-            button_click_cooldown -= 1
+        # Skip optional overlays when the frame has used up its budget since
+        # capture (inference included), so a slow machine shows a minimal
+        # frame instead of falling further behind
+        budget_left = FRAME_TIME - (time.monotonic() - captured_at)
+        fast_path = budget_left < 0.005
 
         # ---------------- MERGE CANVAS ----------------
-        gray = cv2.cvtColor(canvas.canvas, cv2.COLOR_BGR2GRAY)
-        _, mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
-        mask_inv = cv2.bitwise_not(mask)
-
-        img_bg = cv2.bitwise_and(img, img, mask=mask_inv)
-        canvas_fg = cv2.bitwise_and(canvas.canvas, canvas.canvas, mask=mask)
-        img = cv2.add(img_bg, canvas_fg)
+        # One fused compiled pass: rasterizes the frame's queued stroke
+        # points, then writes palette colors wherever the canvas has ink
+        canvas.composite(img)
 
         draw_ui(img, hover_x, hover_y)
 
-        if DEBUG_MODE and lm is not None:
+        if DEBUG_MODE and lm is not None and not fast_path:
             tracker.draw_landmarks(img, lm, draw_connections=True)
 
             bbox = tracker.get_hand_bbox(lm)
@@ -377,40 +661,38 @@ try:
             handedness = tracker.get_handedness()
             if handedness:
                 cv2.putText(img, f"Hand: {handedness}", (20, 150),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+                           FONT, 0.6, HEADING, 2)
 
         if hover_x is not None and hover_y is not None:
             draw_cursor(img, hover_x, hover_y, is_drawing, is_eraser_mode)
 
-        draw_info_panel(img)
+        if not fast_path:
+            draw_info_panel(img)
 
-        if show_stats:
+        if show_stats and not fast_path:
             stats = tracker.get_statistics()
             y_pos = 120
             cv2.putText(img, f"Detection Rate: {stats['success_rate']:.1f}%",
-                       (20, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+                       (20, y_pos), FONT, 0.5, STATS_COLOR, 1)
             y_pos += 20
             cv2.putText(img, f"Stable: {stats['currently_stable']}",
-                       (20, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+                       (20, y_pos), FONT, 0.5, STATS_COLOR, 1)
             y_pos += 20
             cv2.putText(img, f"Confidence: {stats['confidence']:.2f}",
-                       (20, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+                       (20, y_pos), FONT, 0.5, STATS_COLOR, 1)
 
-        if show_instructions:
+        if show_instructions and not fast_path:
             draw_instructions(img)
 
-        fps_color = (0, 255, 0) if current_fps >= 25 else (0, 165, 255)
-        cv2.putText(img, f"FPS: {current_fps}", (20, HEIGHT - 15),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, fps_color, 2)
+        fps_color = FPS_GOOD if current_fps >= 25 else FPS_LOW
+        cv2.putText(img, fps_text, (20, HEIGHT - 15), FONT, 0.6, fps_color, 2)
 
         cv2.imshow("Air Canvas Pro - Enhanced", img)
+        pipeline.recycle(img)  # imshow keeps its own copy
 
-        elapsed = time.time() - frame_start
-        if elapsed < FRAME_TIME:
-            wait_time = int((FRAME_TIME - elapsed) * 1000)
-            key = cv2.waitKey(max(1, wait_time)) & 0xFF
-        else:
-            key = cv2.waitKey(1) & 0xFF
+        # Pump the GUI and collect keys with a minimal waitKey; it is not
+        # used as the frame timer
+        key = cv2.waitKey(1) & 0xFF
 
         if key == 27:
             break
@@ -444,7 +726,8 @@ except Exception as e:
     import traceback
     traceback.print_exc()
 finally:
-    cap.release()
+    pipeline.stop()
+    camera.release()
     cv2.destroyAllWindows()
     tracker.cleanup()
     print("Air Canvas closed. Thanks for creating!")
\ No newline at end of file
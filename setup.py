@@ -38,7 +38,8 @@ def check_dependencies():
     required_packages = {
         'cv2': 'opencv-python',
         'mediapipe': 'mediapipe',
-        'numpy': 'numpy'
+        'numpy': 'numpy',
+        'numba': 'numba'
     }
 
     missing_packages = []
@@ -55,6 +56,9 @@ def check_dependencies():
             elif module_name == 'numpy':
                 import numpy
                 print(f"[OK] {package_name:20s} (version {numpy.__version__})")
+            elif module_name == 'numba':
+                import numba
+                print(f"[OK] {package_name:20s} (version {numba.__version__})")
         except ImportError:
             print(f"[FAIL] {package_name:20s} (not installed)")
             missing_packages.append(package_name)
@@ -171,6 +175,7 @@ def create_requirements_txt():
     requirements = """opencv-python>=4.8.0
 mediapipe>=0.10.0
 numpy>=1.24.0
+numba>=0.57.0
 """
 
     try:
@@ -243,7 +248,7 @@ def main():
 
     # Dependencies
     try:
-        import cv2, mediapipe, numpy
+        import cv2, mediapipe, numpy, numba
         print("[OK] All dependencies installed")
     except ImportError:
         print("[FAIL] Some dependencies missing")